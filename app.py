@@ -1,152 +1,289 @@
+from typing import NamedTuple
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-
-default_base_data = {
-    "Revenue": 162990.0,
-    "COGS": 113347.0,
-    "SG&A": 7588.0 + 7631.0,   
-    "R&D": 1296.0,
-    "EBIT": 34424.0,
-    "D&A": 4812.0,
-    "CapEx": 2237.0,
-    "ΔNWC": 3611.0,
-    "Tax Expense": 10858.0,
-    "Tax Rate": 0.2887,
-    "Shares Diluted": 4152051184 / 1e7,  
-}
 
-# Session state init
-if "base_data" not in st.session_state:
-    st.session_state.base_data = default_base_data.copy()
 
-# -------------------------
+class Margins(NamedTuple):
+    cogs_pct: float
+    sgna_pct: float
+    rnd_pct: float
+    da_pct: float
+    capex_pct: float
+
+
+class BaseData(NamedTuple):
+    revenue: float
+    cogs: float
+    sgna: float
+    rnd: float
+    ebit: float
+    da: float
+    capex: float
+    delta_nwc: float
+    tax_expense: float
+    tax_rate: float
+    shares_diluted: float
+
+    def margins(self):
+        # Line-item margins used as the defaults for the margin inputs, from one revenue reciprocal
+        per_revenue = 1.0 / self.revenue
+        return Margins(
+            cogs_pct=self.cogs * per_revenue,
+            sgna_pct=self.sgna * per_revenue,
+            rnd_pct=self.rnd * per_revenue,
+            da_pct=self.da * per_revenue,
+            capex_pct=self.capex * per_revenue,
+        )
+
+
+# Display labels for the base-data editor, in BaseData field order
+BASE_DATA_LABELS = ["Revenue", "COGS", "SG&A", "R&D", "EBIT", "D&A", "CapEx", "ΔNWC", "Tax Expense", "Tax Rate", "Shares Diluted"]
+
+default_base_data = BaseData(
+    revenue=162990.0,
+    cogs=113347.0,
+    sgna=7588.0 + 7631.0,
+    rnd=1296.0,
+    ebit=34424.0,
+    da=4812.0,
+    capex=2237.0,
+    delta_nwc=3611.0,
+    tax_expense=10858.0,
+    tax_rate=0.2887,
+    shares_diluted=4152051184 / 1e7,
+)
+
+DEFAULT_MARGINS = default_base_data.margins()
 
-with st.sidebar.expander("Company Base Data (FY2025, consolidated)", expanded=False):
-    st.caption("Defaults are Infosys FY2025 values.")
+DEFAULT_BASE_DATA_FRAME = pd.DataFrame({"Value": default_base_data}, index=BASE_DATA_LABELS)
 
-    if st.button("Reset to Infosys FY2025 defaults"):
-        st.session_state.base_data = default_base_data.copy()
 
-    base_data = {}
-    for key, val in st.session_state.base_data.items():
-        base_data[key] = st.number_input(key, value=float(val), format="%.4f")
-    st.session_state.base_data = base_data  # update session state after edits
+# The sensitivity grid is display-only, so float32 is plenty and halves its size
+WACC_RANGE = np.linspace(0.06, 0.14, 10, dtype=np.float32)
+TG_RANGE = np.linspace(0.00, 0.05, 10, dtype=np.float32)
 
-# Derived margins
-margins = {
-    "cogs_pct": base_data["COGS"] / base_data["Revenue"],
-    "sgna_pct": base_data["SG&A"] / base_data["Revenue"],
-    "rnd_pct": base_data["R&D"] / base_data["Revenue"],
-    "da_pct": base_data["D&A"] / base_data["Revenue"],
-    "capex_pct": base_data["CapEx"] / base_data["Revenue"],
+# Static heatmap scaffolding; only the z-grid changes between runs
+HEATMAP_X_LABELS = [f"{g:.1%}" for g in TG_RANGE]
+HEATMAP_Y_LABELS = [f"{w:.1%}" for w in WACC_RANGE]
+HEATMAP_AXIS_LABELS = dict(x="Terminal Growth", y="WACC", color="₹/share")
+
+PROJECTION_COLUMNS = ["Year","Revenue","COGS","SG&A","R&D","EBITDA","D&A","EBIT","NOPAT","CapEx","ΔNWC","FCF","Discount Factor","PV FCF"]
+PROJECTION_COLUMN_CONFIG = {
+    c: st.column_config.NumberColumn(format="%d" if c == "Year" else "%,.2f") for c in PROJECTION_COLUMNS
 }
 
-# -------------------------
-with st.sidebar.expander("Line-item Margins (defaults from FY2025)", expanded=False):
-    cogs_pct = st.number_input("COGS % of revenue", value=float(margins["cogs_pct"]), format="%.4f")
-    sgna_pct = st.number_input("SG&A % of revenue", value=float(margins["sgna_pct"]), format="%.4f")
-    rnd_pct = st.number_input("R&D % of revenue", value=float(margins["rnd_pct"]), format="%.4f")
-    da_pct = st.number_input("D&A % of revenue", value=float(margins["da_pct"]), format="%.4f")
-    capex_pct = st.number_input("CapEx % of revenue", value=float(margins["capex_pct"]), format="%.4f")
 
-# -------------------------
-st.sidebar.header("Working capital & tax")
-use_actual_nwc = st.sidebar.checkbox(f"Use observed ΔNWC FY2025 (₹{int(base_data['ΔNWC']):,} Cr)", value=True)
-tax_rate = st.sidebar.number_input("Effective tax rate", value=float(base_data["Tax Rate"]), format="%.4f")
+def build_projection(revenue, growth_rate, projection_years, cogs_pct, sgna_pct, rnd_pct, da_pct, capex_pct, tax_rate, nwc_change, wacc):
+    # One row per line item, so each column below is a contiguous view into a single allocation
+    out = np.empty((len(PROJECTION_COLUMNS), projection_years), dtype=np.float64)
+    years, revenues, cogs, sgna, rnd, ebitda, da, ebit, nopat, capex, nwc, fcf, discount_factors, pv_fcf = out
 
-st.sidebar.header("Discounting / Terminal")
-wacc = st.sidebar.slider("WACC (decimal)", 0.06, 0.15, 0.10)
-terminal_growth = st.sidebar.slider("Terminal Growth (decimal)", 0.00, 0.05, 0.02)
-ebitda_exit_multiple = st.sidebar.slider("EBITDA Exit Multiple (x)", 8.0, 20.0, 12.0)
-projection_years = st.sidebar.slider("Projection Years", 3, 10, 5)
+    years[:] = np.arange(1, projection_years + 1, dtype=np.float64)
+    one_minus_tax = 1.0 - tax_rate
+    growth_factor = 1.0 + growth_rate
+    discount_step = 1.0 / (1.0 + wacc)
+    np.cumprod(np.full(projection_years, growth_factor, dtype=np.float64), out=revenues)
+    revenues *= revenue
+    np.cumprod(np.full(projection_years, discount_step, dtype=np.float64), out=discount_factors)
 
-growth_rate = st.sidebar.slider("Revenue Growth Rate", 0.04, 0.12, 0.06)
+    np.multiply(revenues, cogs_pct, out=cogs)
+    np.multiply(revenues, sgna_pct, out=sgna)
+    np.multiply(revenues, rnd_pct, out=rnd)
+    np.multiply(revenues, da_pct, out=da)
+    np.subtract(revenues, cogs, out=ebitda)
+    ebitda -= sgna
+    ebitda -= rnd
+    np.subtract(ebitda, da, out=ebit)
+    np.multiply(ebit, one_minus_tax, out=nopat)
+    np.multiply(revenues, capex_pct, out=capex)
+    nwc.fill(nwc_change)
+    np.add(nopat, da, out=fcf)
+    fcf -= capex
+    fcf -= nwc
+    np.multiply(fcf, discount_factors, out=pv_fcf)
 
-# -------------------------
+    return dict(zip(PROJECTION_COLUMNS, out))
+
+
+def sensitivity_factors(projection_years):
+    # Grid-only part of PV(TV) per unit of final-year FCF; independent of the company inputs
+    W = WACC_RANGE[:, None]
+    G = TG_RANGE[None, :]
+    one_plus_G = 1.0 + G
+    # Gordon growth is undefined where g >= WACC; mask those cells instead of dividing by <= 0
+    spread = np.where(W > G, W - G, np.float32(np.nan))
+    return one_plus_G / spread / ((1.0 + W) ** projection_years)
+
+
+def build_sensitivity(last_fcf, pv_fcfs, shares, projection_years):
+    pv_tv = np.float32(last_fcf) * sensitivity_factors(projection_years)
+    return (np.float32(pv_fcfs) + pv_tv) * np.float32(1e7) / np.float32(shares)
+
+
+@st.cache_data
+def compute_dcf(revenue, growth_rate, projection_years, cogs_pct, sgna_pct, rnd_pct, da_pct, capex_pct, tax_rate, nwc_change,
+                wacc, terminal_growth, ebitda_exit_multiple, shares):
+    # Scalar-only arguments keep the cache key cheap to hash
+    projection = build_projection(
+        revenue, growth_rate, projection_years,
+        cogs_pct, sgna_pct, rnd_pct, da_pct, capex_pct, tax_rate,
+        nwc_change, wacc,
+    )
 
-projections = []
-revenue = base_data["Revenue"]
+    last_fcf = float(projection["FCF"][-1])
+    last_ebitda = float(projection["EBITDA"][-1])
+    terminal_discount = float(projection["Discount Factor"][-1])
 
-for year in range(1, projection_years + 1):
-    revenue *= (1 + growth_rate)
-    cogs = revenue * cogs_pct
-    sgna = revenue * sgna_pct
-    rnd = revenue * rnd_pct
-    da = revenue * da_pct
-    ebitda = revenue - cogs - sgna - rnd
-    ebit = ebitda - da
-    nopat = ebit * (1 - tax_rate)
-    capex = revenue * capex_pct
-    nwc = base_data["ΔNWC"] if use_actual_nwc else 0
-    fcf = nopat + da - capex - nwc
-    discount_factor = 1 / ((1 + wacc) ** year)
-    pv_fcf = fcf * discount_factor
+    pv_fcfs = projection["PV FCF"].sum()
+    one_plus_g = 1.0 + terminal_growth
+    gordon_spread = wacc - terminal_growth
+    terminal_value_gordon = (last_fcf * one_plus_g) / gordon_spread
+    pv_terminal_gordon = terminal_value_gordon * terminal_discount
 
-    projections.append([year, revenue, cogs, sgna, rnd, ebitda, da, ebit, nopat, capex, nwc, fcf, discount_factor, pv_fcf])
+    terminal_value_multiple = last_ebitda * ebitda_exit_multiple
+    pv_terminal_multiple = terminal_value_multiple * terminal_discount
+
+    ev_gordon = pv_fcfs + pv_terminal_gordon
+    ev_multiple = pv_fcfs + pv_terminal_multiple
+
+    equity_value_gordon = ev_gordon  # Infosys is net cash (no debt)
+    equity_value_multiple = ev_multiple
+
+    valuation = {
+        "pv_fcfs": pv_fcfs,
+        "pv_terminal_gordon": pv_terminal_gordon,
+        "pv_terminal_multiple": pv_terminal_multiple,
+        "ev_gordon": ev_gordon,
+        "ev_multiple": ev_multiple,
+        "per_share_gordon": (equity_value_gordon * 1e7) / shares,
+        "per_share_multiple": (equity_value_multiple * 1e7) / shares,
+    }
+
+    heatmap_data = build_sensitivity(last_fcf, pv_fcfs, shares, projection_years)
+
+    return projection, valuation, heatmap_data
+
+
+@st.cache_data
+def build_heatmap_fig(heatmap_data):
+    import plotly.express as px  # deferred: only the heatmap needs plotly
+
+    return px.imshow(
+        heatmap_data,
+        x=HEATMAP_X_LABELS,
+        y=HEATMAP_Y_LABELS,
+        color_continuous_scale="BrBG",
+        aspect="auto",
+        labels=HEATMAP_AXIS_LABELS,
+    )
 
-df = pd.DataFrame(projections, columns=["Year","Revenue","COGS","SG&A","R&D","EBITDA","D&A","EBIT","NOPAT","CapEx","ΔNWC","FCF","Discount Factor","PV FCF"])
 
 # -------------------------
-pv_fcfs = df["PV FCF"].sum()
-terminal_value_gordon = (df.iloc[-1]["FCF"] * (1 + terminal_growth)) / (wacc - terminal_growth)
-pv_terminal_gordon = terminal_value_gordon / ((1 + wacc) ** projection_years)
 
-terminal_value_multiple = df.iloc[-1]["EBITDA"] * ebitda_exit_multiple
-pv_terminal_multiple = terminal_value_multiple / ((1 + wacc) ** projection_years)
+st.session_state.setdefault("base_data_resets", 0)
+if st.sidebar.button("Reset to Infosys FY2025 defaults"):
+    # A new key mounts a fresh editor; the frontend would otherwise restore the old edits
+    st.session_state["base_data_resets"] += 1
+    st.session_state.pop("derived_inputs", None)
+    st.session_state.pop("use_actual_nwc", None)
+
+# Batch every DCF input so a round of edits triggers one re-run on submit
+with st.sidebar.form("dcf_inputs"):
+    with st.expander("Company Base Data (FY2025, consolidated)", expanded=False):
+        st.caption("Defaults are Infosys FY2025 values.")
+
+        # One editable grid instead of a number_input per line item. The source frame and key
+        # stay fixed between resets so the widget keeps its edits; the values come from its return value.
+        edited = st.data_editor(
+            DEFAULT_BASE_DATA_FRAME,
+            key=f"base_data_editor_{st.session_state['base_data_resets']}",
+            column_config={"Value": st.column_config.NumberColumn(format="%.4f", required=True)},
+            width="stretch",
+        )
+        base_data = BaseData(*(float(val) for val in edited["Value"]))
+
+    # Derived margins
+    if base_data == default_base_data:
+        margins = DEFAULT_MARGINS
+    else:
+        margins = base_data.margins()
 
-ev_gordon = pv_fcfs + pv_terminal_gordon
-ev_multiple = pv_fcfs + pv_terminal_multiple
+    # Keyed inputs keep their IDs when the base data changes. On a new derivation, only inputs
+    # still at the previous derived value follow it, so an override submitted alongside is kept.
+    derived_inputs = {f"margin_{field}": value for field, value in zip(Margins._fields, margins)}
+    derived_inputs["tax_rate"] = base_data.tax_rate
+    previous_inputs = st.session_state.get("derived_inputs")
+    if derived_inputs != previous_inputs:
+        for key, value in derived_inputs.items():
+            if previous_inputs is None or st.session_state.get(key) == previous_inputs[key]:
+                st.session_state[key] = value
+        st.session_state["derived_inputs"] = derived_inputs
 
-equity_value_gordon = ev_gordon  # Infosys is net cash (no debt)
-equity_value_multiple = ev_multiple
+    with st.expander("Line-item Margins (defaults from FY2025)", expanded=False):
+        cogs_pct = st.number_input("COGS % of revenue", key="margin_cogs_pct", format="%.4f")
+        sgna_pct = st.number_input("SG&A % of revenue", key="margin_sgna_pct", format="%.4f")
+        rnd_pct = st.number_input("R&D % of revenue", key="margin_rnd_pct", format="%.4f")
+        da_pct = st.number_input("D&A % of revenue", key="margin_da_pct", format="%.4f")
+        capex_pct = st.number_input("CapEx % of revenue", key="margin_capex_pct", format="%.4f")
 
-per_share_gordon = (equity_value_gordon * 1e7) / base_data["Shares Diluted"]
-per_share_multiple = (equity_value_multiple * 1e7) / base_data["Shares Diluted"]
+    # -------------------------
+    st.header("Working capital & tax")
+    use_actual_nwc = st.checkbox(
+        "Use observed ΔNWC FY2025",
+        value=True,
+        key="use_actual_nwc",
+        help=f"₹{int(base_data.delta_nwc):,} Cr from the base data",
+    )
+    tax_rate = st.number_input("Effective tax rate", key="tax_rate", format="%.4f")
+
+    st.header("Discounting / Terminal")
+    wacc = st.slider("WACC (decimal)", 0.06, 0.15, 0.10)
+    terminal_growth = st.slider("Terminal Growth (decimal)", 0.00, 0.05, 0.02)
+    ebitda_exit_multiple = st.slider("EBITDA Exit Multiple (x)", 8.0, 20.0, 12.0)
+    projection_years = st.slider("Projection Years", 3, 10, 5)
+
+    growth_rate = st.slider("Revenue Growth Rate", 0.04, 0.12, 0.06)
+
+    st.form_submit_button("Run DCF")
+
+# -------------------------
+
+projection, valuation, heatmap_data = compute_dcf(
+    base_data.revenue, growth_rate, projection_years,
+    cogs_pct, sgna_pct, rnd_pct, da_pct, capex_pct, tax_rate,
+    base_data.delta_nwc if use_actual_nwc else 0.0,
+    wacc, terminal_growth, ebitda_exit_multiple, base_data.shares_diluted,
+)
 
 # -------------------------
 st.title("Interactive DCF: Infosys Limited (INFY)")
 st.caption("Source: Consolidated FY2024–25 annual report (₹ crore). No assumptions beyond reported line-items.")
 
 st.subheader("Valuation Summary (₹ crore)")
-st.write(f"**Enterprise Value (Gordon growth)**: ₹{ev_gordon:,.2f} Cr")
-st.write(f"**Enterprise Value (EBITDA multiple)**: ₹{ev_multiple:,.2f} Cr")
-st.write(f"**PV of FCFs**: ₹{pv_fcfs:,.2f} Cr")
-st.write(f"**PV of Terminal Value (Gordon)**: ₹{pv_terminal_gordon:,.2f} Cr")
-st.write(f"**PV of Terminal Value (Multiple)**: ₹{pv_terminal_multiple:,.2f} Cr")
-st.write(f"**Equity Value per Share (Gordon)**: ₹{per_share_gordon:,.2f}")
-st.write(f"**Equity Value per Share (Multiple)**: ₹{per_share_multiple:,.2f}")
+st.markdown("\n\n".join([
+    f"**Enterprise Value (Gordon growth)**: ₹{valuation['ev_gordon']:,.2f} Cr",
+    f"**Enterprise Value (EBITDA multiple)**: ₹{valuation['ev_multiple']:,.2f} Cr",
+    f"**PV of FCFs**: ₹{valuation['pv_fcfs']:,.2f} Cr",
+    f"**PV of Terminal Value (Gordon)**: ₹{valuation['pv_terminal_gordon']:,.2f} Cr",
+    f"**PV of Terminal Value (Multiple)**: ₹{valuation['pv_terminal_multiple']:,.2f} Cr",
+    f"**Equity Value per Share (Gordon)**: ₹{valuation['per_share_gordon']:,.2f}",
+    f"**Equity Value per Share (Multiple)**: ₹{valuation['per_share_multiple']:,.2f}",
+]))
 
 st.subheader("Projection Table (line-item)")
-st.dataframe(df.style.format("{:,.2f}"))
+st.dataframe(
+    projection,
+    column_config=PROJECTION_COLUMN_CONFIG,
+    width="stretch",
+)
 
 # -------------------------
 st.subheader("Sensitivity (Interactive)")
 
-wacc_range = np.linspace(0.06, 0.14, 10)
-tg_range = np.linspace(0.00, 0.05, 10)
-
-heatmap_data = []
-for w in wacc_range:
-    row = []
-    for g in tg_range:
-        tv = (df.iloc[-1]["FCF"] * (1 + g)) / (w - g)
-        ev = pv_fcfs + tv / ((1 + w) ** projection_years)
-        ps = (ev * 1e7) / base_data["Shares Diluted"]
-        row.append(ps)
-    heatmap_data.append(row)
-
-fig = px.imshow(
-    heatmap_data,
-    x=[f"{g:.1%}" for g in tg_range],
-    y=[f"{w:.1%}" for w in wacc_range],
-    color_continuous_scale="BrBG",  
-    aspect="auto",
-    labels=dict(x="Terminal Growth", y="WACC", color="₹/share"),
-)
-
-st.plotly_chart(fig, use_container_width=True)
+fig = build_heatmap_fig(heatmap_data)
+st.plotly_chart(fig, width="stretch")
 
 st.markdown("---")
 st.subheader("Omitted items")